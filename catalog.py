@@ -0,0 +1,132 @@
+import bisect
+import pickle
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+# Temperature properties with range indexes, effective value is properties over default_properties
+RANGE_FIELDS = ("temp_min", "temp_max", "bed_temp_min", "bed_temp_max", "softening_temp")
+
+
+def property_val(record: dict, key: str) -> Any:
+    value = (record.get("properties") or {}).get(key)
+    if value is None:
+        value = (record.get("default_properties") or {}).get(key)
+    return value
+
+
+class FilamentCatalog:
+    """parse() filament records with lazily built hash and range indexes.
+
+    Hash indexes are built per field combination on first use, e.g. "id",
+    "short_code", "brand_key", "material_key" or
+    ("material_key", "material_type_key"). Range indexes cover RANGE_FIELDS.
+    """
+
+    def __init__(self, records: List[dict]):
+        self.records = records
+        self._hash_indexes: Dict[Tuple[str, ...], Dict[Any, List[int]]] = {}
+        self._range_indexes: Dict[str, Tuple[List[Any], List[int]]] = {}
+
+    @classmethod
+    def from_parsed(cls, data: Dict[str, Any], resource_key: str = "filaments"):
+        records = data.get(resource_key)
+        if not isinstance(records, list):
+            raise ValueError(f"'{resource_key}' is not a list of records")
+        return cls(records)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self) -> Iterator[dict]:
+        return iter(self.records)
+
+    def index(self, *fields: str) -> Dict[Any, List[int]]:
+        """Record positions by value of fields (a tuple of values for several fields)."""
+        index = self._hash_indexes.get(fields)
+        if index is None:
+            index = {}
+            if len(fields) == 1:
+                (field,) = fields
+                for i, record in enumerate(self.records):
+                    index.setdefault(record.get(field), []).append(i)
+            else:
+                for i, record in enumerate(self.records):
+                    key = tuple(record.get(field) for field in fields)
+                    index.setdefault(key, []).append(i)
+            self._hash_indexes[fields] = index
+        return index
+
+    def range_index(self, field: str) -> Tuple[List[Any], List[int]]:
+        """Sorted effective property values and their record positions."""
+        if field not in RANGE_FIELDS:
+            raise ValueError(f"No range index for '{field}', expected one of: {', '.join(RANGE_FIELDS)}")
+        index = self._range_indexes.get(field)
+        if index is None:
+            pairs = sorted(
+                (value, i)
+                for i, record in enumerate(self.records)
+                if (value := property_val(record, field)) is not None
+            )
+            index = [value for value, _ in pairs], [i for _, i in pairs]
+            self._range_indexes[field] = index
+        return index
+
+    def build_indexes(self):
+        """Build the common indexes up front, e.g. before save()."""
+        for fields in (
+            ("id",),
+            ("short_code",),
+            ("brand_key",),
+            ("material_key",),
+            ("material_key", "material_type_key"),
+        ):
+            self.index(*fields)
+        for field in RANGE_FIELDS:
+            self.range_index(field)
+
+    def get(self, value: Any, field: str = "id") -> Optional[dict]:
+        """Record by a unique field, the last record wins like a dict."""
+        positions = self.index(field).get(value)
+        return self.records[positions[-1]] if positions else None
+
+    def _positions(self, field: str, criterion: Any) -> List[int]:
+        if field in RANGE_FIELDS:
+            low, high = criterion
+            values, positions = self.range_index(field)
+            start = 0 if low is None else bisect.bisect_left(values, low)
+            end = len(values) if high is None else bisect.bisect_right(values, high)
+            return positions[start:end]
+        if isinstance(criterion, tuple):
+            return self.index(*field.split("__")).get(criterion, [])
+        return self.index(field).get(criterion, [])
+
+    def query(self, **criteria: Any) -> List[dict]:
+        """Records matching every criterion, in catalog order.
+
+        field=value matches a field exactly; temperature fields take an
+        inclusive (low, high) range where either bound may be None; and
+        material_key__material_type_key=("pla", "basic") uses a combined index.
+        """
+        matches = None
+        for positions in sorted(
+            (self._positions(field, criterion) for field, criterion in criteria.items()),
+            key=len,
+        ):
+            matches = set(positions) if matches is None else matches.intersection(positions)
+            if not matches:
+                return []
+        if matches is None:
+            return list(self.records)
+        return [self.records[i] for i in sorted(matches)]
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+    @classmethod
+    def load(cls, path: str) -> "FilamentCatalog":
+        # pickle.load runs code from the file: only load index files you wrote yourself
+        with open(path, "rb") as f:
+            catalog = pickle.load(f)
+        if not isinstance(catalog, cls):
+            raise ValueError(f"{path} is not a {cls.__name__}")
+        return catalog
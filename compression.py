@@ -0,0 +1,76 @@
+import argparse
+import gzip
+import io
+import lzma
+import sys
+import zlib
+from typing import IO, Optional
+
+# File extension: compression
+COMPRESSIONS = {".gz": "gzip", ".xz": "xz"}
+
+
+def detect_compression(path: str) -> Optional[str]:
+    for extension, compression in COMPRESSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+
+def open_file(path: str, mode: str = "r", compression: Optional[str] = None) -> IO:
+    """Open a file, or stdin/stdout for "-", with streaming gzip/xz (de)compression.
+
+    The compression defaults to the file extension. Compressed output is
+    written with a zero timestamp so identical data gives identical files.
+    """
+    compression = compression or detect_compression(path)
+    binary_mode = mode.replace("t", "").replace("b", "") + "b"
+    if compression not in (None, "gzip", "xz"):
+        raise ValueError(f"Unknown compression: {compression}")
+
+    if path == "-":
+        std = sys.stdin if "r" in mode else sys.stdout
+        std.flush()
+        if compression is None:
+            # Closing the returned file must not close the process' stdin/stdout
+            stream = open(std.fileno(), binary_mode, closefd=False)
+            stream.raw.name = std.name
+        elif compression == "gzip":
+            stream = gzip.GzipFile(filename="", mode=binary_mode, fileobj=std.buffer, mtime=0)
+            stream.name = std.name  # After the header is written without a file name
+        else:
+            stream = lzma.LZMAFile(std.buffer, binary_mode)
+    elif compression is None:
+        stream = open(path, binary_mode)
+    elif compression == "gzip":
+        stream = gzip.GzipFile(path, binary_mode, mtime=0)
+    else:
+        stream = lzma.LZMAFile(path, binary_mode)
+    if not hasattr(stream, "name"):
+        # LZMAFile has no name before Python 3.13
+        stream.name = std.name if path == "-" else path
+
+    if "b" in mode:
+        return stream
+    return io.TextIOWrapper(stream, encoding="utf-8")
+
+
+class CompressedFileType:
+    """argparse.FileType that (de)compresses by file extension."""
+
+    def __init__(self, mode: str = "r"):
+        self.mode = mode
+
+    def __call__(self, path: str) -> IO:
+        try:
+            stream = open_file(path, self.mode)
+        except OSError as e:
+            raise argparse.ArgumentTypeError(f"can't open '{path}': {e}")
+        if "r" in self.mode and detect_compression(path) is not None:
+            # Read the header and first block now, so corrupt input is an argument error
+            try:
+                getattr(stream, "buffer", stream).peek(1)
+            except (OSError, EOFError, lzma.LZMAError, zlib.error) as e:
+                stream.close()
+                raise argparse.ArgumentTypeError(f"can't read '{path}': {e}")
+        return stream
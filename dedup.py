@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""Near-duplicate filament detection.
+
+Only records sharing (brand_key, material_key) can be duplicates, so those
+are the blocks. Within a block, candidate pairs are records with an identical
+rgb or the same normalized website, plus pairs from an inverted index of color
+name trigrams with prefix filtering: each record only indexes its rarest
+trigrams, as many as a pair needs to share one of them and still reach the
+threshold. Common trigrams like "ack" are skipped without losing any pair.
+
+A pair scores the weighted color name, rgb and website similarity, or a rule
+score when the rgb or website is identical, whichever is higher. Scored pairs
+above the threshold are merged into clusters.
+"""
+import argparse
+import itertools
+import json
+import math
+import re
+import sys
+import time
+from collections import Counter, defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import urlsplit
+
+from catalog import FilamentCatalog
+from compression import CompressedFileType
+
+# Score weights of color name similarity, rgb similarity and same website
+NAME_WEIGHT = 0.55
+RGB_WEIGHT = 0.25
+URL_WEIGHT = 0.2
+# Score multiplier when the material types differ (e.g. "Silk" vs "Matte")
+MATERIAL_TYPE_PENALTY = 0.75
+# Rule score of an identical rgb or the same website, and of both
+EXACT_MATCH_SCORE = 0.8
+EXACT_MATCHES_SCORE = 0.9
+# More records than this in a block sharing an rgb or website are placeholders or
+# generic pages (e.g. a brand homepage), not a duplicate signal
+MAX_EXACT_GROUP = 25
+# Colors further apart than this (euclidean rgb distance) have no rgb similarity
+RGB_DISTANCE_RANGE = 96
+
+
+def normalize_name(name: Optional[str]) -> str:
+    return " ".join(re.findall(r"[a-z0-9]+", (name or "").lower()))
+
+
+def trigrams(name: str) -> Set[str]:
+    padded = f"  {name} " if name else ""
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def parse_rgb(rgb: Optional[str]) -> Optional[Tuple[int, int, int]]:
+    if not rgb or not re.fullmatch(r"#?[0-9a-fA-F]{6}", rgb):
+        return None
+    value = int(rgb.lstrip("#"), 16)
+    return value >> 16, (value >> 8) & 0xFF, value & 0xFF
+
+
+def normalize_url(url: Optional[str]) -> Optional[str]:
+    if not url:
+        return None
+    parts = urlsplit(url.strip().lower())
+    host = parts.netloc.removeprefix("www.")
+    if not host:
+        return None
+    return host + parts.path.rstrip("/")
+
+
+class DuplicateFinder:
+    def __init__(self, catalog: FilamentCatalog):
+        self.catalog = catalog
+        records = catalog.records
+        self.names = [normalize_name(r.get("color")) for r in records]
+        self.trigrams = [trigrams(name) for name in self.names]
+        self.rgbs = [parse_rgb(r.get("rgb")) for r in records]
+        self.urls = [normalize_url(r.get("website")) for r in records]
+        # Per record rgb / website, None where it is generic within its block
+        self.exact_rgbs = self.exact_keys(self.rgbs)
+        self.exact_urls = self.exact_keys(self.urls)
+
+    def exact_keys(self, values: List[Any]) -> List[Any]:
+        records = self.catalog.records
+        keys = [
+            None if value is None else (r.get("brand_key"), r.get("material_key"), value)
+            for r, value in zip(records, values)
+        ]
+        counts = Counter(key for key in keys if key is not None)
+        return [
+            value if key is not None and counts[key] <= MAX_EXACT_GROUP else None
+            for key, value in zip(keys, values)
+        ]
+
+    def blocks(self) -> Iterable[List[int]]:
+        # score() is 0 across brands and materials
+        return self.catalog.index("brand_key", "material_key").values()
+
+    def block_pairs(self, positions: List[int], min_similarity: float) -> Iterable[Tuple[int, int]]:
+        """Pairs in a block with an identical rgb or website, or whose color name
+        similarity can reach min_similarity."""
+        if len(positions) < 2:
+            return
+        if min_similarity <= 0:
+            # rgb and website alone can reach the threshold
+            yield from itertools.combinations(positions, 2)
+            return
+        seen = set()
+        for exact_keys in (self.exact_rgbs, self.exact_urls):
+            groups = defaultdict(list)
+            for i in positions:
+                if exact_keys[i] is not None:
+                    groups[exact_keys[i]].append(i)
+            for group in groups.values():
+                for pair in itertools.combinations(group, 2):
+                    if pair not in seen:
+                        seen.add(pair)
+                        yield pair
+        frequency = Counter(gram for i in positions for gram in self.trigrams[i])
+        postings = defaultdict(list)
+        for i in positions:
+            grams_i = self.trigrams[i]
+            grams = sorted(grams_i, key=lambda gram: (frequency[gram], gram))
+            # Sets with Jaccard >= t share one of their len - ceil(t * len) + 1 rarest grams
+            prefix = len(grams) - math.ceil(min_similarity * len(grams) - 1e-9) + 1
+            for gram in grams[:prefix]:
+                posting = postings[gram]
+                for j in posting:
+                    if (j, i) in seen:
+                        continue
+                    seen.add((j, i))
+                    grams_j = self.trigrams[j]
+                    if len(grams_i & grams_j) >= min_similarity * len(grams_i | grams_j) - 1e-9:
+                        yield j, i
+                posting.append(i)
+
+    def score(self, a: int, b: int) -> float:
+        record_a, record_b = self.catalog.records[a], self.catalog.records[b]
+        if record_a.get("brand_key") != record_b.get("brand_key") or record_a.get(
+            "material_key"
+        ) != record_b.get("material_key"):
+            return 0.0
+        grams_a, grams_b = self.trigrams[a], self.trigrams[b]
+        union = len(grams_a | grams_b)
+        name_similarity = len(grams_a & grams_b) / union if union else 0.0
+        rgb_similarity = 0.0
+        if self.rgbs[a] is not None and self.rgbs[b] is not None:
+            distance = sum((x - y) ** 2 for x, y in zip(self.rgbs[a], self.rgbs[b])) ** 0.5
+            rgb_similarity = max(0.0, 1 - distance / RGB_DISTANCE_RANGE)
+        same_url = self.urls[a] is not None and self.urls[a] == self.urls[b]
+        score = (
+            NAME_WEIGHT * name_similarity
+            + RGB_WEIGHT * rgb_similarity
+            + URL_WEIGHT * same_url
+        )
+        exact_rgb = self.exact_rgbs[a] is not None and self.exact_rgbs[a] == self.exact_rgbs[b]
+        exact_url = self.exact_urls[a] is not None and self.exact_urls[a] == self.exact_urls[b]
+        if exact_rgb and exact_url:
+            score = max(score, EXACT_MATCHES_SCORE)
+        elif exact_rgb or exact_url:
+            score = max(score, EXACT_MATCH_SCORE)
+        if record_a.get("material_type_key") != record_b.get("material_type_key"):
+            score *= MATERIAL_TYPE_PENALTY
+        return score
+
+    def pairs(self, threshold: float) -> Dict[Tuple[int, int], float]:
+        # Lowest name similarity that still reaches the threshold with a close rgb and the
+        # same website, for pairs that block_pairs doesn't already yield as exact matches
+        min_similarity = (threshold - RGB_WEIGHT - URL_WEIGHT) / NAME_WEIGHT
+        scored = {}
+        for positions in self.blocks():
+            for pair in self.block_pairs(positions, min_similarity):
+                score = self.score(*pair)
+                if score >= threshold:
+                    scored[pair] = score
+        return scored
+
+    def clusters(self, threshold: float) -> List[dict]:
+        pairs = self.pairs(threshold)
+        parent = {}
+
+        def find(i):
+            parent.setdefault(i, i)
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for a, b in pairs:
+            parent[find(a)] = find(b)
+        members = defaultdict(list)
+        for i in parent:
+            members[find(i)].append(i)
+        cluster_pairs = defaultdict(list)
+        for (a, b), score in pairs.items():
+            cluster_pairs[find(a)].append((a, b, score))
+
+        records = self.catalog.records
+        clusters = []
+        for root, positions in members.items():
+            positions.sort()
+            scores = [score for _, _, score in cluster_pairs[root]]
+            clusters.append(
+                {
+                    "score": round(max(scores), 3),
+                    "brand_key": records[positions[0]].get("brand_key"),
+                    "material_key": records[positions[0]].get("material_key"),
+                    "filaments": [
+                        {
+                            "id": records[i].get("id"),
+                            "material_type_key": records[i].get("material_type_key"),
+                            "color": records[i].get("color"),
+                            "rgb": records[i].get("rgb"),
+                            "website": records[i].get("website"),
+                        }
+                        for i in positions
+                    ],
+                    "pairs": [
+                        [records[a].get("id"), records[b].get("id"), round(score, 3)]
+                        for a, b, score in sorted(cluster_pairs[root])
+                    ],
+                }
+            )
+        clusters.sort(key=lambda c: (-c["score"], c["filaments"][0]["id"]))
+        return clusters
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("file", type=CompressedFileType("r"), help="path to a filaments.json")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.75,
+        help="Minimum pair score (0-1); defaults to %(default)s",
+    )
+    args = parser.parse_args()
+
+    start = time.time()
+    catalog = FilamentCatalog.from_parsed(json.load(args.file))
+    clusters = DuplicateFinder(catalog).clusters(args.threshold)
+    print(
+        f"Found {len(clusters)} candidate clusters in {len(catalog)} filaments"
+        f" ({time.time() - start:.2f}s)",
+        file=sys.stderr,
+    )
+    print(json.dumps(clusters, indent=2))
@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import shutil
+import sys
+
+import repo_root  # noqa: F401
+from bambu_lab import _base_example, bambu_lab_filament_format, bambu_lab_profile_path, load_filaments
+from catalog import FilamentCatalog
+from compression import CompressedFileType, open_file
+from filament_profile import to_filament_profile
+from orca_slicer import orca_slicer_filament_format, orca_slicer_profile_path
+from profile_archive import write_profile_archive
+from prusa_slicer import prusa_slicer_filament_format, prusa_slicer_profile_path
+
+# Slicer name: (profile path, profile data) writers of a FilamentProfile
+writers = {
+    "bambu": (bambu_lab_profile_path, bambu_lab_filament_format),
+    "orca": (orca_slicer_profile_path, orca_slicer_filament_format),
+    "prusa": (prusa_slicer_profile_path, prusa_slicer_filament_format),
+}
+
+
+def export(profiles, slicers):
+    """Run every selected writer over each profile in a single pass."""
+    results = {}
+    selected = [writers[slicer] for slicer in slicers]
+    for profile in profiles:
+        for profile_path, profile_data in selected:
+            results[profile_path(profile)] = profile_data(profile)
+    return results
+
+
+def dump_profile(data) -> str:
+    return data if isinstance(data, str) else json.dumps(data, indent=2)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+
+    parser.add_argument(
+        "file", nargs="?", type=CompressedFileType("r"), help="path to a filaments.json"
+    )
+    parser.add_argument(
+        "myfile",
+        nargs="?",
+        type=CompressedFileType("r"),
+        help="path to a myfilaments.json",
+    )
+    parser.add_argument(
+        "--slicer",
+        action="append",
+        choices=list(writers),
+        help="Slicer to export, may be repeated; defaults to all",
+    )
+    parser.add_argument(
+        "--compress",
+        choices=["gzip", "xz"],
+        help="Compress the output regardless of --output extension",
+    )
+    output_group = parser.add_mutually_exclusive_group()
+    output_group.add_argument(
+        "--output",
+        default="-",
+        help="Output file, .gz/.xz are compressed; defaults to stdout",
+    )
+    output_group.add_argument(
+        "--dir", help="Output directory (instead of stdout)"
+    )
+    output_group.add_argument(
+        "--archive",
+        help="Output .zip, .tar.gz or .tgz archive of the --dir tree (instead of stdout)",
+    )
+    args = parser.parse_args()
+    if args.compress is not None and (args.dir is not None or args.archive is not None):
+        parser.error("--compress only applies to --output or stdout, not --dir/--archive")
+    slicers = args.slicer or list(writers)
+
+    if args.file is None and args.myfile is None:
+        print("No file provided. Using example data", file=sys.stderr)
+        filaments = [json.loads(_base_example)]
+    else:
+        filaments = json.load(args.file)["filaments"]
+    if args.myfile is not None:
+        my_filaments = FilamentCatalog.from_parsed(json.load(args.myfile))
+    else:
+        my_filaments = None
+
+    models = load_filaments(filaments, my_filaments, args.file and args.file.name)
+    # Each profile is dropped once its writers ran
+    results = export(map(to_filament_profile, models), slicers)
+
+    if args.archive is not None:
+        try:
+            write_profile_archive(
+                args.archive,
+                ((filepath, dump_profile(data)) for filepath, data in results.items()),
+            )
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.dir is None:
+        # sort filename keys
+        results = dict(sorted(results.items()))
+        with open_file(args.output, "w", args.compress) as output:
+            json.dump(results, output, indent=2)
+            output.write("\n")
+    else:
+        for filepath in {path.split(os.sep)[0] for path in results}:
+            shutil.rmtree(os.path.join(args.dir, filepath), ignore_errors=True)
+        for filepath, data in results.items():
+            new_file = os.path.join(args.dir, filepath)
+            os.makedirs(os.path.dirname(new_file), exist_ok=True)
+            with open(new_file, "w") as of:
+                of.write(dump_profile(data))
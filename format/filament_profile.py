@@ -0,0 +1,292 @@
+"""Slicer independent filament profiles shared by the slicer writers.
+
+Each validated Filament is merged (properties over default_properties),
+matched to a base profile / filament type and formatted once into a
+FilamentProfile; the bambu_lab, orca_slicer and prusa_slicer writers only
+map its values to their own options.
+"""
+import functools
+import re
+import sys
+from dataclasses import MISSING, dataclass, fields
+from typing import TYPE_CHECKING, Optional
+from unittest.mock import ANY
+
+if TYPE_CHECKING:
+    from bambu_lab import Filament
+
+# https://github.com/bambulab/BambuStudio/tree/98bfabdd/resources/profiles/BBL/filament
+profiles_available = {
+    "Generic ABS @0.2 nozzle", "Generic ABS @BBL A1 0.2 nozzle", "Generic ABS @BBL A1",
+    "Generic ABS @BBL X1E 0.2 nozzle", "Generic ABS @BBL X1E", "Generic ABS @base", "Generic ABS",
+    "Generic ASA @0.2 nozzle", "Generic ASA @BBL A1 0.2 nozzle", "Generic ASA @BBL A1",
+    "Generic ASA @BBL X1E 0.2 nozzle", "Generic ASA @BBL X1E", "Generic ASA @base", "Generic ASA",
+    "Generic BVOH @BBL A1", "Generic BVOH @BBL A1M", "Generic BVOH @BBL X1C", "Generic BVOH @base",
+    "Generic EVA @BBL A1", "Generic EVA @BBL A1M", "Generic EVA @BBL X1C", "Generic EVA @base",
+    "Generic HIPS @BBL A1 0.2 nozzle", "Generic HIPS @BBL A1", "Generic HIPS @BBL A1M 0.2 nozzle",
+    "Generic HIPS @BBL A1M", "Generic HIPS @BBL X1C 0.2 nozzle", "Generic HIPS @BBL X1C", "Generic HIPS @base",
+    "Generic PA @BBL A1", "Generic PA-CF @BBL A1", "Generic PA-CF @BBL X1E", "Generic PA-CF", "Generic PA",
+    "Generic PC @0.2 nozzle", "Generic PC @BBL A1 0.2 nozzle", "Generic PC @BBL A1", "Generic PC @BBL P1S 0.2 nozzle",
+    "Generic PC @BBL P1S", "Generic PC @BBL X1E 0.2 nozzle", "Generic PC @BBL X1E", "Generic PC @base", "Generic PC",
+    "Generic PCTG @BBL A1", "Generic PCTG @BBL A1M", "Generic PCTG @BBL X1C", "Generic PCTG @base",
+    "Generic PE @BBL A1", "Generic PE @BBL A1M", "Generic PE @BBL X1C", "Generic PE @base", "Generic PE-CF @BBL A1",
+    "Generic PE-CF @BBL A1M", "Generic PE-CF @BBL X1C", "Generic PE-CF @base", "Generic PETG @0.2 nozzle",
+    "Generic PETG @BBL A1 0.2 nozzle", "Generic PETG @BBL A1", "Generic PETG @BBL A1M 0.2 nozzle",
+    "Generic PETG @BBL A1M", "Generic PETG @base", "Generic PETG HF @BBL A1 0.2 nozzle", "Generic PETG HF @BBL A1",
+    "Generic PETG HF @BBL A1M 0.2 nozzle", "Generic PETG HF @BBL A1M", "Generic PETG HF @BBL P1P 0.2 nozzle",
+    "Generic PETG HF @BBL P1P", "Generic PETG HF @BBL X1C 0.2 nozzle", "Generic PETG HF @BBL X1C",
+    "Generic PETG HF @base", "Generic PETG-CF @BBL A1", "Generic PETG-CF @BBL X1C", "Generic PETG-CF @base",
+    "Generic PETG", "Generic PHA @BBL A1", "Generic PHA @BBL A1M", "Generic PHA @BBL X1C", "Generic PHA @base",
+    "Generic PLA @0.2 nozzle", "Generic PLA @BBL A1 0.2 nozzle", "Generic PLA @BBL A1",
+    "Generic PLA @BBL A1M 0.2 nozzle", "Generic PLA @BBL A1M", "Generic PLA @base",
+    "Generic PLA High Speed @BBL A1 0.2 nozzle", "Generic PLA High Speed @BBL A1",
+    "Generic PLA High Speed @BBL A1M 0.2 nozzle", "Generic PLA High Speed @BBL A1M",
+    "Generic PLA High Speed @BBL P1P 0.2 nozzle", "Generic PLA High Speed @BBL P1P",
+    "Generic PLA High Speed @BBL X1C 0.2 nozzle", "Generic PLA High Speed @BBL X1C", "Generic PLA High Speed @base",
+    "Generic PLA Silk @BBL A1", "Generic PLA Silk @BBL A1M", "Generic PLA Silk @base", "Generic PLA Silk",
+    "Generic PLA-CF @BBL A1", "Generic PLA-CF @BBL A1M", "Generic PLA-CF @base", "Generic PLA-CF", "Generic PLA",
+    "Generic PP @BBL A1", "Generic PP @BBL A1M", "Generic PP @BBL X1C", "Generic PP @base", "Generic PP-CF @BBL A1",
+    "Generic PP-CF @BBL X1C", "Generic PP-CF @base", "Generic PP-GF @BBL A1", "Generic PP-GF @BBL X1C",
+    "Generic PP-GF @base", "Generic PPA-CF @BBL X1C", "Generic PPA-CF @BBL X1E", "Generic PPA-CF @base",
+    "Generic PPA-GF @BBL X1C", "Generic PPA-GF @BBL X1E", "Generic PPA-GF @base", "Generic PPS @BBL X1E",
+    "Generic PPS @base", "Generic PPS-CF @BBL X1E", "Generic PPS-CF @base", "Generic PVA @0.2 nozzle",
+    "Generic PVA @BBL A1 0.2 nozzle", "Generic PVA @BBL A1", "Generic PVA @BBL A1M 0.2 nozzle", "Generic PVA @BBL A1M",
+    "Generic PVA @base", "Generic PVA", "Generic TPU @BBL A1", "Generic TPU @BBL A1M", "Generic TPU for AMS @BBL A1",
+    "Generic TPU for AMS @BBL A1M", "Generic TPU for AMS @BBL P1P", "Generic TPU for AMS @BBL X1C",
+    "Generic TPU for AMS @base", "Generic TPU", "Generic ABS @BBL P1P 0.2 nozzle", "Generic ABS @BBL P1P",
+    "Generic ASA @BBL P1P 0.2 nozzle", "Generic ASA @BBL P1P", "Generic PA @BBL P1P", "Generic PA-CF @BBL P1P",
+    "Generic PC @BBL P1P 0.2 nozzle", "Generic PC @BBL P1P", "Generic PETG @BBL P1P 0.2 nozzle",
+    "Generic PETG @BBL P1P", "Generic PETG-CF @BBL A1M", "Generic PETG-CF @BBL P1P", "Generic PLA @BBL P1P 0.2 nozzle",
+    "Generic PLA @BBL P1P", "Generic PLA Silk @BBL P1P", "Generic PLA-CF @BBL P1P", "Generic PVA @BBL P1P 0.2 nozzle",
+    "Generic PVA @BBL P1P", "Generic TPU @BBL P1P", "Bambu PET-CF @BBL A1", "Bambu PET-CF @BBL X1C",
+    "Bambu PET-CF @BBL X1E", "Bambu PET-CF @BBL P1P", "Bambu PET-CF @base", "fdm_filament_abs", "fdm_filament_asa",
+    "fdm_filament_bvoh", "fdm_filament_common", "fdm_filament_eva", "fdm_filament_hips", "fdm_filament_pa",
+    "fdm_filament_pc", "fdm_filament_pctg", "fdm_filament_pe", "fdm_filament_pet", "fdm_filament_pha",
+    "fdm_filament_pla", "fdm_filament_pp", "fdm_filament_ppa", "fdm_filament_pps", "fdm_filament_pva",
+    "fdm_filament_tpu",
+}
+
+# A mapping of material_key and material_type_key to base profile
+# Order is important, generic -> specific, lowest in list wins
+base_profiles = [
+    ("abs", ANY, "Generic ABS"),
+    ("abs-plus", ANY, "Generic ABS"),
+    ("asa", ANY, "Generic ASA"),
+    ("asa-plus", ANY, "Generic ASA"),
+    ("hips", ANY, "Generic HIPS @BBL X1C"),
+    ("pa", ANY, "Generic PA"),
+    ("pa", "cf", "Generic PA-CF"),
+    ("pa12", ANY, "Generic PA"),
+    ("pa6", ANY, "Generic PA"),
+    ("pa612", ANY, "Generic PA"),
+    ("paht", ANY, "Generic PA"),
+    ("pa", "ht", "Generic PA"),
+    ("pc", ANY, "Generic PC"),
+    ("pctg", ANY, "Generic PCTG @BBL X1C"),
+    ("pe", ANY, "Generic PE"),
+    ("pe", "cf", "Generic PE-CF @BBL X1C"),
+    ("pet", ANY, "fdm_filament_pet"),
+    ("pet", "cf", "Bambu PET-CF @BBL X1C"),
+    ("petg", ANY, "Generic PETG"),
+    ("petg", "cf", "Generic PETG-CF @BBL X1C"),
+    ("petg-plus", ANY, "Generic PETG"),
+    ("pla", ANY, "Generic PLA"),
+    ("pla", "cf", "Generic PLA-CF"),
+    ("pla-plus", ANY, "Generic PLA"),
+    ("pla-plus-cf", ANY, "Generic PETG-CF @BBL X1C"),
+    ("pp", ANY, "Generic PP"),
+    ("pp", "cf", "Generic PP-CF @BBL X1C"),
+    ("ppa", ANY, "Generic PPA"),
+    ("ppa", "cf", "Generic PPA-CF @BBL X1C"),
+    ("pps", ANY, "Generic PPS"),
+    ("pps", "cf", "Generic PPS-CF @BBL X1E"),
+    ("pva", ANY, "Generic PVA"),
+    ("tpu", ANY, "Generic TPU"),
+]
+
+filament_types_available = {
+    # https://github.com/bambulab/BambuStudio/blob/98bfabdd/src/slic3r/GUI/CreatePresetsDialog.cpp#L43
+    "PLA", "PLA+", "PLA Tough", "PETG", "ABS", "ASA", "FLEX", "HIPS", "PA", "PACF", "NYLON", "PVA", "PC", "PCABS",
+    "PCTG", "PCCF", "PP", "PEI", "PET", "PETG", "PETGCF", "PTBA", "PTBA90A", "PEEK", "TPU93A", "TPU75D", "TPU",
+    "TPU-AMS", "TPU92A", "TPU98A", "Misc", "TPE", "GLAZE", "Nylon", "CPE", "METAL", "ABST", "Carbon Fiber",
+    # https://github.com/bambulab/BambuStudio/blob/98bfabdd/src/libslic3r/PrintConfig.cpp#L1572
+    "PLA", "ABS", "ASA", "ASA-CF", "PETG", "PCTG", "TPU", "TPU-AMS", "PC", "PA", "PA-CF", "PA-GF", "PA6-CF", "PLA-CF",
+    "PET-CF", "PETG-CF", "PVA", "HIPS", "PLA-AERO", "PPS", "PPS-CF", "PPA-CF", "PPA-GF", "ABS-GF", "ASA-Aero", "PE",
+    "PP", "EVA", "PHA", "BVOH", "PE-CF", "PP-CF", "PP-GF",
+    # https://github.com/SoftFever/OrcaSlicer/blob/2ea2ab08/src/slic3r/GUI/CreatePresetsDialog.cpp#L62C57-L65C139
+    "PLA", "rPLA", "PLA+", "PLA Tough", "PETG", "ABS", "ASA", "FLEX", "HIPS", "PA", "PACF", "NYLON", "PVA", "PVB", "PC",
+    "PCABS", "PCTG", "PCCF", "PHA", "PP", "PEI", "PET", "PETGCF", "PTBA", "PTBA90A", "PEEK", "TPU93A", "TPU75D", "TPU",
+    "TPU92A", "TPU98A", "Misc", "TPE", "GLAZE", "Nylon", "CPE", "METAL", "ABST", "Carbon Fiber", "SBS",
+}
+
+# A mapping of material_key and material_type_key to filament type
+# Order is important, generic -> specific, lowest in list wins
+filament_types = [
+    ("abs", ANY, "ABS"),
+    ("abs-plus", ANY, "ABS"),
+    ("asa", ANY, "ASA"),
+    ("asa", "aero", "ASA-Aero"),
+    ("asa", "cf", "ASA-CF"),
+    ("asa-plus", ANY, "ASA"),
+    ("hips", ANY, "HIPS"),
+    ("pa", ANY, "PA"),
+    ("pa", "cf", "PA-CF"),
+    ("pa12", ANY, "PA"),
+    ("pa6", ANY, "PA"),
+    ("pa6", "cf", "PA6-CF"),
+    ("pa612", ANY, "PA"),
+    ("paht", ANY, "PA"),
+    ("pa", "ht", "PA"),
+    ("pc", ANY, "PC"),
+    ("pc", "cf", "PCCF"),
+    ("pcabs", ANY, "PCABS"),
+    ("pctg", ANY, "PCTG"),
+    ("pe", ANY, "PE"),
+    ("pe", "cf", "PE-CF"),
+    ("pet", ANY, "PET"),
+    ("pet", "cf", "PET-CF"),
+    ("petg", ANY, "PETG"),
+    ("petg", "cf", "PETG-CF"),
+    ("petg-plus", ANY, "PETG"),
+    ("pla", ANY, "PLA"),
+    ("pla", "aero", "PLA-AERO"),
+    ("pla", "cf", "PLA-CF"),
+    ("pla-plus", ANY, "PLA+"),
+    ("pla-plus-cf", ANY, "PLA+"),
+    ("pp", ANY, "PP"),
+    ("pp", "cf", "PP-CF"),
+    ("ppa", ANY, "PPA"),
+    ("ppa", "cf", "PPA-CF"),
+    ("ppa", "gf", "PPA-GF"),
+    ("pps", ANY, "PPS"),
+    ("pps", "cf", "PPS-CF"),
+    ("pva", ANY, "PVA"),
+    ("tpu", ANY, "TPU"),
+    ("tpu", "ams", "TPU-AMS"),
+]
+
+
+@functools.lru_cache(maxsize=None)
+def _lookup_profile_and_type(material_key: str, material_type_key: str):
+    for _material_key, _material_type_key, base_profile in reversed(base_profiles):
+        if material_key == _material_key and material_type_key == _material_type_key:
+            break
+    else:
+        base_profile = f"Generic {material_key.upper()}"
+    for _material_key, _material_type_key, filament_type in reversed(filament_types):
+        if material_key == _material_key and material_type_key == _material_type_key:
+            break
+    else:
+        filament_type = material_key.upper()
+    return base_profile, filament_type
+
+
+def resolve_profile_and_type(
+    material_key: str, material_type_key: str, material: str, material_type: str
+):
+    base_profile, filament_type = _lookup_profile_and_type(
+        material_key, material_type_key
+    )
+    if base_profile not in profiles_available:
+        print(
+            f"Warning: '{base_profile}.json' ({material} {material_type}) not in profiles",
+            file=sys.stderr,
+        )
+        base_profile = ""  # fallback to inherits:""
+    if filament_type not in filament_types_available:
+        print(
+            f"Warning: '{filament_type}' ({material} {material_type}) not in filament_types",
+            file=sys.stderr,
+        )
+        filament_type = ""  # fallback to filament_type:[]
+    return base_profile, filament_type
+
+
+@dataclass(slots=True)
+class FilamentProfile:
+    """Slicer independent profile values, validated and formatted once per filament."""
+
+    name: str
+    vendor: str
+    brand_key: str
+    material_key: str
+    material_type_key: str
+    base_profile: str
+    filament_type: str
+    color: Optional[str] = None
+    nozzle_temp: Optional[str] = None
+    nozzle_temp_high: Optional[str] = None
+    nozzle_temp_low: Optional[str] = None
+    bed_temp: Optional[str] = None
+    softening_temp: Optional[str] = None
+    fan_max_speed: Optional[str] = None
+    fan_min_speed: Optional[str] = None
+    flow_ratio: Optional[str] = None
+    max_volumetric_speed: Optional[str] = None
+    cost: Optional[str] = None
+    retraction_minimum_travel: Optional[str] = None
+
+    def __post_init__(self):
+        # Writers copy the values into slicer options as is
+        for key in _fields:
+            value = getattr(self, key)
+            if not isinstance(value, str) and (value is not None or key in _required_fields):
+                raise ValueError(f"Invalid FilamentProfile {key}: {value!r}")
+
+
+_fields = [f.name for f in fields(FilamentProfile)]
+_required_fields = {f.name for f in fields(FilamentProfile) if f.default is MISSING}
+
+
+_profile_property_keys = [
+    "temp_max", "temp_min", "bed_temp_min", "bed_temp_max", "softening_temp",
+    "fan_speed_max", "fan_speed_min", "flow_ratio", "max_volumetric_speed",
+]
+
+
+def _format_int(value) -> Optional[str]:
+    return None if value is None else f"{value}"
+
+
+def _format_number(value) -> Optional[str]:
+    return None if value is None else f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+def _format_mean(low, high) -> Optional[str]:
+    # todo: better logic to determine best temp from range
+    temps = [temp for temp in (low, high) if temp is not None]
+    return f"{sum(temps) // len(temps)}" if temps else None
+
+
+def to_filament_profile(f: "Filament") -> FilamentProfile:
+    base_profile, filament_type = resolve_profile_and_type(
+        f.material_key, f.material_type_key, f.material, f.material_type
+    )
+    props = {key: f.property_val(key) for key in _profile_property_keys}
+    price = getattr(f.price_data, "price", None)
+    has_td = f.td_value not in (None, 0) and f.total_td_votes not in (None, 0)
+    return FilamentProfile(
+        name=" ".join(filter(None, [f.brand_name, f.material, f.material_type])),
+        vendor=f.brand_name,
+        brand_key=f.brand_key,
+        material_key=f.material_key,
+        material_type_key=f.material_type_key,
+        base_profile=base_profile,
+        filament_type=filament_type,
+        color=f.rgb,
+        nozzle_temp=_format_mean(props["temp_min"], props["temp_max"]),
+        nozzle_temp_high=_format_int(props["temp_max"]),
+        nozzle_temp_low=_format_int(props["temp_min"]),
+        bed_temp=_format_mean(props["bed_temp_min"], props["bed_temp_max"]),
+        softening_temp=_format_number(props["softening_temp"]),
+        fan_max_speed=_format_int(props["fan_speed_max"]),
+        fan_min_speed=_format_int(props["fan_speed_min"]),
+        flow_ratio=_format_number(props["flow_ratio"]),
+        max_volumetric_speed=_format_number(props["max_volumetric_speed"]),
+        cost=_format_number(price) if price else None,
+        retraction_minimum_travel=_format_number(f.td_value) if has_td else None,
+    )
+
+
+def slugify(s: str) -> str:
+    return re.sub(r"\W+", "-", s).strip("-").lower()
@@ -0,0 +1,78 @@
+import os
+
+from filament_profile import FilamentProfile, slugify
+
+orca_slicer_version = "2.2.0.4"
+
+# Options written to OrcaSlicer user filament presets
+# https://github.com/SoftFever/OrcaSlicer/blob/v2.2.0/src/libslic3r/Preset.cpp
+filament_options = {
+    "type", "name", "inherits", "from", "instantiation", "version", "filament_settings_id", "filament_type",
+    "filament_vendor", "compatible_printers", "default_filament_colour", "nozzle_temperature",
+    "nozzle_temperature_initial_layer", "nozzle_temperature_range_high", "nozzle_temperature_range_low",
+    "hot_plate_temp", "hot_plate_temp_initial_layer", "textured_plate_temp", "textured_plate_temp_initial_layer",
+    "temperature_vitrification", "fan_max_speed", "fan_min_speed", "filament_flow_ratio",
+    "filament_max_volumetric_speed", "filament_cost", "filament_retraction_minimum_travel",
+}
+
+# Optional OrcaSlicer fields in output order: (FilamentProfile field, filament options)
+_orca_slicer_optional_fields = [
+    ("color", ("default_filament_colour",)),
+    ("nozzle_temp", ("nozzle_temperature", "nozzle_temperature_initial_layer")),
+    ("nozzle_temp_high", ("nozzle_temperature_range_high",)),
+    ("nozzle_temp_low", ("nozzle_temperature_range_low",)),
+    (
+        "bed_temp",
+        (
+            "hot_plate_temp",
+            "hot_plate_temp_initial_layer",
+            "textured_plate_temp",
+            "textured_plate_temp_initial_layer",
+        ),
+    ),
+    ("softening_temp", ("temperature_vitrification",)),
+    ("fan_max_speed", ("fan_max_speed",)),
+    ("fan_min_speed", ("fan_min_speed",)),
+    ("flow_ratio", ("filament_flow_ratio",)),
+    ("max_volumetric_speed", ("filament_max_volumetric_speed",)),
+    ("cost", ("filament_cost",)),
+    ("retraction_minimum_travel", ("filament_retraction_minimum_travel",)),
+]
+
+
+def validate_orca_slicer_format(data: dict):
+    if not filament_options.issuperset(data):
+        unknown_keys = data.keys() - filament_options
+        raise ValueError(f"Unknown keys: {', '.join(unknown_keys)}")
+
+
+def orca_slicer_profile_path(profile: FilamentProfile) -> str:
+    return os.path.join(
+        "orcaslicer",
+        "filament",
+        slugify(f"{profile.brand_key}-{profile.material_key}-{profile.material_type_key}")
+        + ".json",
+    )
+
+
+def orca_slicer_filament_format(profile: FilamentProfile) -> dict:
+    # OrcaSlicer bundles the Bambu Lab system profiles, so the same base profile is inherited
+    data = {
+        "type": "filament",
+        "name": profile.name,
+        "inherits": profile.base_profile,
+        "from": "User",
+        "instantiation": "true",
+        "filament_settings_id": [profile.name],
+        "filament_type": [profile.filament_type] if profile.filament_type else [],
+        "filament_vendor": [profile.vendor],
+        "compatible_printers": [],
+        "version": orca_slicer_version,
+    }
+    for field, options in _orca_slicer_optional_fields:
+        value = getattr(profile, field)
+        if value is not None:
+            for option in options:
+                data[option] = [value]
+    validate_orca_slicer_format(data)
+    return data
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+import argparse
+import gzip
+import io
+import os
+import sys
+import tarfile
+import zipfile
+from typing import Iterable, Iterator, Optional, Tuple
+
+# Fixed entry metadata so the same profiles always produce the same archive bytes
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+ENTRY_MODE = 0o644
+
+
+def archive_format(path: str) -> str:
+    if path.endswith(".zip"):
+        return "zip"
+    if path.endswith((".tar.gz", ".tgz")):
+        return "tar.gz"
+    raise ValueError(f"Unsupported archive type: {path} (expected .zip, .tar.gz or .tgz)")
+
+
+def write_profile_archive(path: str, files: Iterable[Tuple[str, str]]):
+    """Stream (name, text) entries into a reproducible zip or tar.gz, sorted by name."""
+    fmt = archive_format(path)
+    entries = sorted(files)
+    if fmt == "zip":
+        with zipfile.ZipFile(path, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            for name, text in entries:
+                info = zipfile.ZipInfo(name, date_time=ZIP_DATE_TIME)
+                info.compress_type = zipfile.ZIP_DEFLATED
+                info.external_attr = ENTRY_MODE << 16
+                zf.writestr(info, text.encode("utf-8"))
+    else:
+        with open(path, "wb") as f, gzip.GzipFile(
+            filename="", mode="wb", fileobj=f, mtime=0
+        ) as gz, tarfile.open(fileobj=gz, mode="w", format=tarfile.PAX_FORMAT) as tf:
+            for name, text in entries:
+                data = text.encode("utf-8")
+                info = tarfile.TarInfo(name)
+                info.size = len(data)
+                info.mtime = 0
+                info.mode = ENTRY_MODE
+                tf.addfile(info, io.BytesIO(data))
+
+
+def list_profiles(path: str) -> Iterator[str]:
+    if archive_format(path) == "zip":
+        with zipfile.ZipFile(path) as zf:
+            yield from zf.namelist()
+    else:
+        with tarfile.open(path, mode="r:gz") as tf:
+            for info in tf:
+                if info.isfile():
+                    yield info.name
+
+
+def read_profile(path: str, name: str) -> Optional[str]:
+    """Read a single profile without extracting the archive."""
+    if archive_format(path) == "zip":
+        with zipfile.ZipFile(path) as zf:
+            try:
+                return zf.read(name).decode("utf-8")
+            except KeyError:
+                return None
+    # tar.gz has no index, stream until the entry is found
+    with tarfile.open(path, mode="r|gz") as tf:
+        for info in tf:
+            if info.name == name and info.isfile():
+                return tf.extractfile(info).read().decode("utf-8")
+    return None
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("archive", help="path to a .zip, .tar.gz or .tgz profile archive")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("list", help="List profiles in the archive")
+    show_parser = subparsers.add_parser("show", help="Print one profile")
+    show_parser.add_argument("name", help="profile path inside the archive")
+    extract_parser = subparsers.add_parser("extract", help="Extract one profile")
+    extract_parser.add_argument("name", help="profile path inside the archive")
+    extract_parser.add_argument(
+        "--dir", default=".", help="Output directory; defaults to current directory"
+    )
+    args = parser.parse_args()
+
+    try:
+        archive_format(args.archive)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.command == "list":
+        for name in list_profiles(args.archive):
+            print(name)
+        exit(0)
+
+    text = read_profile(args.archive, args.name)
+    if text is None:
+        print(f"Error: {args.name} not found in {args.archive}", file=sys.stderr)
+        exit(1)
+    if args.command == "show":
+        sys.stdout.write(text)
+    else:
+        if os.path.isabs(args.name) or ".." in args.name.split("/"):
+            print(f"Error: refusing to extract {args.name} outside --dir", file=sys.stderr)
+            exit(1)
+        new_file = os.path.join(args.dir, args.name)
+        os.makedirs(os.path.dirname(new_file), exist_ok=True)
+        with open(new_file, "w") as of:
+            of.write(text)
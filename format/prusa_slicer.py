@@ -0,0 +1,61 @@
+import os
+
+from filament_profile import FilamentProfile, slugify
+
+prusa_slicer_version = "2.8.1"
+
+# PrusaSlicer filament_type choices
+filament_types_available = {
+    "PLA", "PET", "ABS", "ASA", "FLEX", "HIPS", "EDGE", "NGEN", "PA", "NYLON", "PVA", "PC", "PP", "PEI", "PEEK",
+    "PEKK", "POM", "PSU", "PVDF", "SCAFF",
+}
+
+# A mapping of FilamentProfile fields to PrusaSlicer options
+_prusa_slicer_fields = [
+    ("color", ("filament_colour",)),
+    ("nozzle_temp", ("temperature", "first_layer_temperature")),
+    ("bed_temp", ("bed_temperature", "first_layer_bed_temperature")),
+    ("fan_max_speed", ("max_fan_speed",)),
+    ("fan_min_speed", ("min_fan_speed",)),
+    ("flow_ratio", ("extrusion_multiplier",)),
+    ("max_volumetric_speed", ("filament_max_volumetric_speed",)),
+    ("cost", ("filament_cost",)),
+]
+
+
+def prusa_slicer_profile_path(profile: FilamentProfile) -> str:
+    return os.path.join(
+        "prusaslicer",
+        "filament",
+        slugify(f"{profile.brand_key}-{profile.material_key}-{profile.material_type_key}")
+        + ".ini",
+    )
+
+
+def prusa_slicer_filament_type(filament_type: str) -> str:
+    # PrusaSlicer has no fiber filled variants, "PETG-CF" -> "PET"
+    for candidate in (filament_type, filament_type.split("-")[0]):
+        candidate = candidate.upper().rstrip("+")
+        if candidate == "PETG":
+            candidate = "PET"
+        if candidate in filament_types_available:
+            return candidate
+    return ""
+
+
+def prusa_slicer_filament_format(profile: FilamentProfile) -> str:
+    options = {
+        "filament_settings_id": f'"{profile.name}"',
+        "filament_vendor": profile.vendor,
+    }
+    filament_type = prusa_slicer_filament_type(profile.filament_type)
+    if filament_type:
+        options["filament_type"] = filament_type
+    for field, names in _prusa_slicer_fields:
+        value = getattr(profile, field)
+        if value is not None:
+            for name in names:
+                options[name] = value
+    lines = [f"# generated by filament-profiles-data for PrusaSlicer {prusa_slicer_version}"]
+    lines.extend(f"{key} = {value}" for key, value in sorted(options.items()))
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,12 @@
+"""Makes the top-level modules (catalog, compression) importable from format/.
+
+The format/ scripts run as `python3 format/<script>.py`, which only puts
+format/ on sys.path. Importing this module appends the repository root once;
+it is appended, not prepended, so it never shadows an importer's modules.
+"""
+import os
+import sys
+
+path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if path not in sys.path:
+    sys.path.append(path)
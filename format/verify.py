@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import sys
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+import pydantic
+
+import repo_root  # noqa: F401
+from bambu_lab import Filament, MyFilament, remove_none_values
+from compression import open_file
+
+models = {"filament": Filament, "myfilament": MyFilament}
+MAX_EXAMPLES = 5
+
+
+def diff_paths(raw: Any, dumped: Any, path: str = "") -> List[Tuple[str, str]]:
+    """(field path, kind) for every difference between raw and dumped json values."""
+    if isinstance(raw, dict) and isinstance(dumped, dict):
+        diffs = []
+        for key in raw.keys() | dumped.keys():
+            key_path = f"{path}.{key}" if path else key
+            if key not in dumped:
+                diffs.append((key_path, "dropped"))
+            elif key not in raw:
+                diffs.append((key_path, "added"))
+            else:
+                diffs.extend(diff_paths(raw[key], dumped[key], key_path))
+        return diffs
+    if isinstance(raw, list) and isinstance(dumped, list) and len(raw) == len(dumped):
+        diffs = []
+        for raw_item, dumped_item in zip(raw, dumped):
+            diffs.extend(diff_paths(raw_item, dumped_item, f"{path}[]"))
+        return diffs
+    if raw != dumped or type(raw) is not type(dumped):
+        return [(path, "changed")]
+    return []
+
+
+def new_report() -> Dict[str, Any]:
+    return {
+        "total": 0,
+        "ok": 0,
+        "mismatched": 0,
+        "invalid": 0,
+        "fields": defaultdict(Counter),  # path -> {kind: count}
+        "examples": defaultdict(list),  # path -> [id, ...]
+    }
+
+
+def check_shard(shard: Tuple[str, List[dict]]) -> Dict[str, Any]:
+    """Round trip each record through model validation and model_dump_json."""
+    model_name, records = shard
+    model = models[model_name]
+    report = new_report()
+
+    def add(path, kind, record_id):
+        report["fields"][path][kind] += 1
+        if len(report["examples"][path]) < MAX_EXAMPLES:
+            report["examples"][path].append(record_id)
+
+    for record in records:
+        report["total"] += 1
+        record_id = record.get("id", record.get("filament_id"))
+        try:
+            instance = model.model_validate(record)
+        except pydantic.ValidationError as e:
+            report["invalid"] += 1
+            for error in e.errors():
+                add(".".join(map(str, error["loc"])), f"invalid:{error['type']}", record_id)
+            continue
+        raw = remove_none_values(record)
+        raw_json = json.dumps(
+            raw, separators=(",", ":"), ensure_ascii=False, sort_keys=True
+        )
+        model_json = instance.model_dump_json(exclude_none=True)
+        if raw_json == model_json:
+            report["ok"] += 1
+            continue
+        report["mismatched"] += 1
+        diffs = diff_paths(raw, json.loads(model_json)) or [("(key order)", "changed")]
+        for path, kind in diffs:
+            add(path, kind, record_id)
+    return report
+
+
+def merge_reports(reports) -> Dict[str, Any]:
+    merged = new_report()
+    for report in reports:
+        for key in ("total", "ok", "mismatched", "invalid"):
+            merged[key] += report[key]
+        for path, kinds in report["fields"].items():
+            merged["fields"][path].update(kinds)
+        for path, ids in report["examples"].items():
+            examples = merged["examples"][path]
+            examples.extend(ids[: MAX_EXAMPLES - len(examples)])
+    return merged
+
+
+def verify(
+    records: List[dict],
+    model_name: Optional[str] = None,
+    workers: Optional[int] = None,
+    shard_size: Optional[int] = None,
+) -> Dict[str, Any]:
+    """Check records in shards across a process pool and merge the shard reports."""
+    if model_name is None:
+        model_name = "myfilament" if records and "filament_id" in records[0] else "filament"
+    workers = workers or os.cpu_count() or 1
+    shard_size = shard_size or max(1, -(-len(records) // (workers * 4)))
+    shards = [
+        (model_name, records[i : i + shard_size])
+        for i in range(0, len(records), shard_size)
+    ]
+    if workers == 1 or len(shards) <= 1:
+        reports = map(check_shard, shards)
+        return merge_reports(reports)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return merge_reports(executor.map(check_shard, shards))
+
+
+def print_report(report: Dict[str, Any], file=sys.stdout):
+    print(
+        f"Checked {report['total']} records: {report['ok']} ok, "
+        f"{report['mismatched']} mismatched, {report['invalid']} invalid",
+        file=file,
+    )
+    for path, kinds in sorted(report["fields"].items()):
+        for kind, count in sorted(kinds.items()):
+            examples = ", ".join(map(str, report["examples"][path]))
+            print(f"  {path}: {kind} x{count} (e.g. ids {examples})", file=file)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "file",
+        nargs="?",
+        default="data/filaments.json",
+        help="path to a filaments.json or myfilaments.json; defaults to %(default)s",
+    )
+    parser.add_argument(
+        "--model",
+        choices=list(models),
+        help="Model to check; detected from the records by default",
+    )
+    parser.add_argument("--workers", type=int, help="Number of processes; defaults to cpu count")
+    parser.add_argument("--shard-size", type=int, help="Records per shard")
+    parser.add_argument("--json", action="store_true", help="Output the report as json")
+    args = parser.parse_args()
+
+    start = time.time()
+    with open_file(args.file) as f:
+        records = json.load(f)["filaments"]
+    report = verify(records, args.model, args.workers, args.shard_size)
+    if args.json:
+        print(json.dumps(report, indent=2))
+    else:
+        print_report(report)
+        print(f"Finished in {time.time() - start:.2f}s", file=sys.stderr)
+    exit(0 if report["ok"] == report["total"] else 1)
@@ -5,12 +5,15 @@ import json
 import os
 import re
 import sys
-from collections import defaultdict
-from typing import List, Tuple
+from collections import Counter, defaultdict
+from typing import Iterator, List, Tuple
 
 import requests
 from dotenv import load_dotenv, set_key
 
+from catalog import FilamentCatalog
+from compression import CompressedFileType, open_file
+
 # Load environment variables
 ENV_FILE = ".env"
 load_dotenv(ENV_FILE)
@@ -18,8 +21,10 @@ load_dotenv(ENV_FILE)
 BASE_URL = "https://3dfilamentprofiles.com"
 RESOURCE_KEY_MAP = {"myfilaments": "filaments"}
 REF_ID_PATTERN = r"[a-z0-9]+"
+REF_ID_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"  # REF_ID_PATTERN characters
+REF_USE_PREFIX = '"$'
 REF_USE_PATTERN = r'"\$(%s)"' % REF_ID_PATTERN
-LINE_PATTERN = r"(%s):(.+)$" % REF_ID_PATTERN
+REF_USE_REGEX = re.compile(REF_USE_PATTERN)
 TARGET_SEARCH_PATTERN = '{"%s":'
 TARGET_ID_PATTERN = rf'"%s":\s*"\$({REF_ID_PATTERN})"'
 
@@ -73,18 +78,92 @@ def fetch(resource):
     if not r.ok:
         print(f"Error: failed to fetch {url} status {r.status_code}", file=sys.stderr)
         exit(1)
-    return r.content.decode("utf-8").splitlines()
+    return r.content
 
 
 def load(file_path):
+    """Read a raw payload, decompressing .gz/.xz files."""
     if type(file_path) is str:
-        with open(file_path, "r") as f:
-            return f.read().splitlines()
-    else:
-        return file_path.read().splitlines()
+        with open_file(file_path, "rb") as f:
+            return f.read()
+    data = file_path.read()
+    return data.encode("utf-8") if isinstance(data, str) else data
+
+
+def print_line_error(line: bytes):
+    print(
+        f"Error: failed to parse line {line[:100].decode('utf-8', 'replace')}",
+        file=sys.stderr,
+        flush=True,
+    )
 
 
-def parse(lines, resource):
+def tokenize(data: bytes) -> Iterator[Tuple[str, str, str]]:
+    """Split an RSC payload into (ref_id, tag, contents) rows.
+
+    Tags: "I" (import), "HL" (hint), "T" (text), other single letter row types,
+    or "" for JSON rows. Text rows are read by their hex byte length, so they may
+    span newlines; their contents are returned as a JSON string.
+    """
+    alphabet = REF_ID_ALPHABET.encode("ascii")
+    pos, size = 0, len(data)
+    while pos < size:
+        newline = data.find(b"\n", pos)
+        if newline == -1:
+            newline = size
+        colon = data.find(b":", pos, newline)
+        ref_id = data[pos:colon] if colon != -1 else b""
+        if not ref_id or ref_id.strip(alphabet) or colon + 1 >= newline:
+            line = data[pos:newline].rstrip(b"\r")
+            if line:
+                print_line_error(line)
+            pos = newline + 1
+            continue
+        start = colon + 1
+        tag = data[start : start + 1]
+        if tag == b"T":
+            comma = data.find(b",", start + 1, newline)
+            length = data[start + 1 : comma] if comma != -1 else b""
+            if length and not length.strip(b"0123456789abcdefABCDEF"):
+                end = comma + 1 + int(length, 16)
+                try:
+                    if end > size:
+                        raise ValueError("text row is truncated")
+                    text = data[comma + 1 : end].decode("utf-8")
+                except ValueError:  # Includes UnicodeDecodeError
+                    print_line_error(data[pos:newline])
+                else:
+                    yield ref_id.decode("ascii"), "T", json.dumps(text)
+                pos = end + 1 if data[end : end + 1] == b"\n" else end
+                continue
+        contents = data[start:newline].rstrip(b"\r").decode("utf-8")
+        if tag == b"H" and data[start + 1 : start + 2] == b"L":
+            tag = "HL"
+        elif tag.isalpha() and tag.isupper():
+            tag = tag.decode("ascii")
+        else:
+            tag = ""
+        yield ref_id.decode("ascii"), tag, contents
+        pos = newline + 1
+
+
+def find_refs(contents: str) -> List[str]:
+    """Referenced row ids, the regex only runs on rows with a reference prefix."""
+    if REF_USE_PREFIX not in contents:
+        return []
+    return REF_USE_REGEX.findall(contents)
+
+
+def parse(data, resource, low_memory=False):
+    """Parse an RSC payload (bytes, str or an iterable of lines) for a resource.
+
+    With low_memory, each row's text is dropped as soon as its last dependent
+    row is resolved, and the high-water mark of resident row text is reported.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    elif not isinstance(data, bytes):
+        data = "\n".join(data).encode("utf-8")
     target_ref_id = None
     fallback_ref_ids = []
     line_dependencies = {}
@@ -92,20 +171,14 @@ def parse(lines, resource):
     resource_key = RESOURCE_KEY_MAP.get(resource, resource)
     search_text = TARGET_SEARCH_PATTERN % resource_key
 
-    for line in lines:
-        match = re.match(LINE_PATTERN, line)
-        if not match:
-            print(
-                f"Error: failed to parse line {line[:100]}", file=sys.stderr, flush=True
-            )
-            continue
-        line_ref = match.group(1)
-        ref_contents = match.group(2)
-
+    for line_ref, tag, ref_contents in tokenize(data):
         line_dependencies[line_ref] = []
         line_contents_by_ref_id[line_ref] = ref_contents
+        if tag:
+            # Only JSON rows reference other rows or hold data
+            continue
 
-        needed_ref_ids = re.findall(REF_USE_PATTERN, ref_contents)
+        needed_ref_ids = find_refs(ref_contents)
         if needed_ref_ids:
             line_dependencies[line_ref].extend(needed_ref_ids)
 
@@ -120,22 +193,64 @@ def parse(lines, resource):
         print(f"Error: '{search_text}' not found", file=sys.stderr)
         exit(1)
 
+    known_ref_ids = line_dependencies.keys() | {"undefined"}
+    if low_memory:
+        # Count the remaining consumers of each row, the parse targets are consumed at the end
+        consumers = Counter(ref for deps in line_dependencies.values() for ref in deps)
+        roots = {target_ref_id, "undefined", *fallback_ref_ids}
+        resident_size = sum(len(c) for c in line_contents_by_ref_id.values())
+        peak_size = resident_size
+        evicted = 0
+
+        def evict(ref_id):
+            nonlocal resident_size, evicted
+            if consumers[ref_id] > 0 or ref_id in roots:
+                return
+            contents = line_contents_by_ref_id.pop(ref_id, None)
+            if contents is not None:
+                resident_size -= len(contents)
+                evicted += 1
+
+        for refID in line_dependencies:
+            evict(refID)
+
     for refID, dependencies in line_dependencies.items():
-        line_contents = line_contents_by_ref_id[refID]
+        # None when evicted: nothing consumes this row, only its references are checked
+        line_contents = line_contents_by_ref_id.get(refID)
 
         for neededRefID in dependencies:
-            if neededRefID in line_contents_by_ref_id:
-                line_contents = line_contents.replace(
-                    '"$' + neededRefID + '"', line_contents_by_ref_id[neededRefID]
-                )
-            else:
+            if neededRefID not in known_ref_ids:
                 print(
                     f"Error: missing reference {neededRefID} for {refID}",
                     file=sys.stderr,
                     flush=True,
                 )
+            elif line_contents is not None:
+                line_contents = line_contents.replace(
+                    '"$' + neededRefID + '"', line_contents_by_ref_id[neededRefID]
+                )
 
-        line_contents_by_ref_id[refID] = line_contents
+        if line_contents is None:
+            pass
+        elif low_memory:
+            resident_size += len(line_contents) - len(line_contents_by_ref_id[refID])
+            peak_size = max(peak_size, resident_size)
+            line_contents_by_ref_id[refID] = line_contents
+        else:
+            line_contents_by_ref_id[refID] = line_contents
+
+        if low_memory:
+            for neededRefID in dependencies:
+                consumers[neededRefID] -= 1
+                evict(neededRefID)
+            evict(refID)
+
+    if low_memory:
+        print(
+            f"Row text high-water mark: {peak_size} chars ({evicted} rows evicted)",
+            file=sys.stderr,
+            flush=True,
+        )
 
     parsed_data = {}
 
@@ -206,7 +321,9 @@ if __name__ == "__main__":
         help="Fetch one of: %(choices)s",
     )
     source_group.add_argument(
-        "--file", type=argparse.FileType("r"), help="path to the file to parse"
+        "--file",
+        type=CompressedFileType("rb"),
+        help="path to the file to parse (.gz/.xz are decompressed)",
     )
     parser_group = parser.add_argument_group("Parse")
     parser_group.add_argument(
@@ -216,20 +333,55 @@ if __name__ == "__main__":
         metavar="RESOURCE",
         help="Parse one of: %(choices)s; defaults to --fetch",
     )
+    parser_group.add_argument(
+        "--low-memory",
+        action="store_true",
+        help="Drop rows once resolved and report the peak row memory",
+    )
+    output_group = parser.add_argument_group("Output")
+    output_group.add_argument(
+        "--output",
+        metavar="PATH",
+        default="-",
+        help="Output file, .gz/.xz are compressed; defaults to stdout",
+    )
+    output_group.add_argument(
+        "--compress",
+        choices=["gzip", "xz"],
+        help="Compress the output regardless of --output extension",
+    )
+    output_group.add_argument(
+        "--index",
+        metavar="PATH",
+        help="Also save a FilamentCatalog of the records with all indexes built",
+    )
     args = parser.parse_args()
 
     if args.fetch:
         args.resource = args.resource or args.fetch
-        data_lines = fetch(args.fetch)
-        if args.resource == "raw":
-            print("\n".join(data_lines))
-            exit(0)
-        data = parse(data_lines, args.resource)
+        payload = fetch(args.fetch)
     elif args.file and not args.resource:
         parser.error("--resource is required when using --file")
     elif args.file:
-        data_lines = load(args.file)
-        data = parse(data_lines, args.resource)
+        payload = load(args.file)
     else:
         parser.error("Either --fetch or --file is required")
-    print(json.dumps(data, indent=2))
+    if args.resource == "raw":
+        # Verbatim: T rows are read by their declared byte length
+        with open_file(args.output, "wb", args.compress) as output:
+            output.write(payload)
+        exit(0)
+    data = parse(payload, args.resource, args.low_memory)
+    if args.index:
+        try:
+            catalog = FilamentCatalog.from_parsed(
+                data, RESOURCE_KEY_MAP.get(args.resource, args.resource)
+            )
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            exit(1)
+        catalog.build_indexes()
+        catalog.save(args.index)
+    with open_file(args.output, "w", args.compress) as output:
+        json.dump(data, output, indent=2)
+        output.write("\n")
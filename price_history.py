@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""Price-history analytics over parsed snapshots.
+
+Price observations (filament id, price_date, price, currency) are extracted from the
+`price_data` of each snapshot into NumPy arrays once, then all statistics are
+computed with sorted group reductions instead of walking records in Python.
+"""
+import argparse
+import csv
+import json
+import lzma
+import sys
+import zlib
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from compression import open_file
+
+GROUPS = ["filament", "brand", "material"]
+
+
+class PriceObservations:
+    def __init__(
+        self,
+        ids: np.ndarray,
+        timestamps: np.ndarray,
+        prices: np.ndarray,
+        currencies: np.ndarray,
+        brand_keys: np.ndarray,
+        material_keys: np.ndarray,
+    ):
+        # Sorted by (id, currency, timestamp) with duplicate observations removed
+        order = np.lexsort((timestamps, currencies, ids))
+        ids, currencies, timestamps = ids[order], currencies[order], timestamps[order]
+        keep = group_starts(ids, currencies, timestamps)
+        order = order[keep]
+        self.ids = ids[keep]
+        self.currencies = currencies[keep]
+        self.timestamps = timestamps[keep]
+        self.prices = prices[order]
+        self.brand_keys = brand_keys[order]
+        self.material_keys = material_keys[order]
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def from_snapshots(
+        cls, snapshots: Iterable[Tuple[Dict[str, Any], Optional[str]]]
+    ) -> "PriceObservations":
+        """Extract observations from (parse() output, fallback date) pairs."""
+        ids, timestamps, prices, currencies, brands, materials = [], [], [], [], [], []
+        for data, fallback_date in snapshots:
+            for key, records in data.items():
+                if not key.startswith("filaments") or not isinstance(records, list):
+                    continue
+                for record in records:
+                    observation = extract_price(record)
+                    if observation is None:
+                        continue
+                    price, price_date, currency = observation
+                    price_date = price_date or fallback_date
+                    if price_date is None:
+                        continue
+                    ids.append(record.get("filament_id") or record["id"])
+                    timestamps.append(to_utc(price_date))
+                    prices.append(price)
+                    currencies.append(currency or "")
+                    brands.append(record.get("brand_key") or "")
+                    materials.append(record.get("material_key") or "")
+        return cls(
+            np.array(ids, dtype=np.int64),
+            np.array(timestamps, dtype="datetime64[ms]"),
+            np.array(prices, dtype=np.float64),
+            np.array(currencies, dtype=str),
+            np.array(brands, dtype=str),
+            np.array(materials, dtype=str),
+        )
+
+    def _series(self) -> np.ndarray:
+        """Series number of each observation, one series per (filament id, currency)."""
+        return np.cumsum(group_starts(self.ids, self.currencies)) - 1
+
+    def filament_stats(self) -> Dict[str, np.ndarray]:
+        """Price trend of each filament, per listing currency."""
+        series = self._series()
+        starts, ends = group_bounds(series)
+        first, last = self.prices[starts], self.prices[ends - 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            pct_change = np.where(first != 0, (last - first) / first * 100, np.nan)
+        stats = {
+            "filament_id": self.ids[starts],
+            "brand_key": self.brand_keys[ends - 1],
+            "material_key": self.material_keys[ends - 1],
+            "currency": self.currencies[ends - 1],
+            "first_date": self.timestamps[starts],
+            "last_date": self.timestamps[ends - 1],
+            "first": first,
+            "last": last,
+        }
+        stats.update(group_stats(series, self.prices))
+        stats["pct_change"] = pct_change
+        return stats
+
+    def aggregate(self, by: str) -> Dict[str, np.ndarray]:
+        """Aggregate the latest price of each filament by (brand_key or material_key, currency)."""
+        latest = self.filament_stats()
+        order = np.lexsort((latest["currency"], latest[by]))
+        keys, currencies = latest[by][order], latest["currency"][order]
+        codes = np.cumsum(group_starts(keys, currencies)) - 1
+        starts, _ = group_bounds(codes)
+        stats = {by: keys[starts], "currency": currencies[starts]}
+        stats.update(group_stats(codes, latest["last"][order]))
+        return stats
+
+
+def extract_price(record: Dict[str, Any]) -> Optional[Tuple[float, Optional[str], Optional[str]]]:
+    price_data = record.get("price_data")
+    if isinstance(price_data, str):
+        try:
+            price_data = json.loads(price_data)
+        except json.JSONDecodeError:
+            return None
+    if not isinstance(price_data, dict):
+        return None
+    price = price_data.get("price")
+    currency = None
+    for listing in price_data.get("listings") or []:
+        listing_price = (listing or {}).get("price") or {}
+        if price is None:
+            price = listing_price.get("amount")
+        currency = listing_price.get("currency")
+        break
+    if not isinstance(price, (int, float)) or isinstance(price, bool):
+        return None
+    return float(price), price_data.get("price_date"), currency
+
+
+def to_utc(timestamp: str) -> str:
+    """An ISO 8601 timestamp as naive UTC, which datetime64 parses without warnings."""
+    if timestamp.endswith("Z"):
+        return timestamp[:-1]
+    if timestamp.endswith("+00:00"):
+        return timestamp[:-6]
+    parsed = datetime.fromisoformat(timestamp)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed.isoformat()
+
+
+def group_starts(*keys: np.ndarray) -> np.ndarray:
+    """True where a row of arrays sorted by keys differs from the previous row in any key."""
+    starts = np.zeros(len(keys[0]), dtype=bool)
+    starts[:1] = True
+    for key in keys:
+        starts[1:] |= key[1:] != key[:-1]
+    return starts
+
+
+def group_bounds(keys: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Start and end offsets of runs of equal values in a sorted array."""
+    if len(keys) == 0:
+        return np.zeros(0, dtype=np.intp), np.zeros(0, dtype=np.intp)
+    starts = np.flatnonzero(group_starts(keys))
+    ends = np.r_[starts[1:], len(keys)]
+    return starts, ends
+
+
+def group_stats(keys: np.ndarray, values: np.ndarray) -> Dict[str, np.ndarray]:
+    """count/min/max/median/mean of values per key."""
+    order = np.lexsort((values, keys))
+    keys, values = keys[order], values[order]
+    starts, ends = group_bounds(keys)
+    counts = ends - starts
+    if len(values) == 0:
+        empty = np.zeros(0, dtype=np.float64)
+        return {"count": counts, "min": empty, "max": empty, "median": empty, "mean": empty}
+    return {
+        "count": counts,
+        "min": values[starts],
+        "max": values[ends - 1],
+        "median": (values[starts + (counts - 1) // 2] + values[starts + counts // 2]) / 2,
+        "mean": np.add.reduceat(values, starts) / counts,
+    }
+
+
+def to_rows(stats: Dict[str, np.ndarray]) -> List[Dict[str, Any]]:
+    columns = {}
+    for name, column in stats.items():
+        if np.issubdtype(column.dtype, np.datetime64):
+            column = np.datetime_as_string(column, unit="ms", timezone="UTC")
+        elif np.issubdtype(column.dtype, np.floating):
+            column = np.round(column, 2)
+            column = np.where(np.isnan(column), None, column)
+        columns[name] = column.tolist()
+    return [dict(zip(columns.keys(), row)) for row in zip(*columns.values())]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "files",
+        nargs="*",
+        help="paths to parser.py output files (myfilaments or filaments)",
+    )
+    parser.add_argument("--archive", help="read every snapshot of a snapshots.py archive")
+    parser.add_argument(
+        "--group",
+        choices=GROUPS,
+        default="filament",
+        help="Aggregate by one of: %(choices)s; defaults to %(default)s",
+    )
+    parser.add_argument(
+        "--format", choices=["csv", "json"], default="csv", help="Output format"
+    )
+    args = parser.parse_args()
+
+    if not args.files and not args.archive:
+        parser.error("Either files or --archive is required")
+
+    def snapshots():
+        # Opened one at a time: a year of daily files would exceed the open file limit
+        for path in args.files:
+            try:
+                with open_file(path) as file:
+                    data = json.load(file)
+            except (OSError, EOFError, lzma.LZMAError, zlib.error) as e:
+                parser.error(f"can't read '{path}': {e}")
+            yield data, None
+        if args.archive:
+            from snapshots import SnapshotArchive
+
+            archive = SnapshotArchive(args.archive)
+            for date in archive.dates:
+                yield archive.snapshot(date), date
+
+    observations = PriceObservations.from_snapshots(snapshots())
+    print(f"Loaded {len(observations)} price observations", file=sys.stderr)
+
+    if args.group == "filament":
+        rows = to_rows(observations.filament_stats())
+    else:
+        rows = to_rows(observations.aggregate(f"{args.group}_key"))
+
+    if args.format == "json":
+        print(json.dumps(rows, indent=2))
+    else:
+        fieldnames = list(rows[0].keys()) if rows else []
+        writer = csv.DictWriter(sys.stdout, fieldnames=fieldnames, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(rows)
@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+"""Content-addressed snapshot archive for parse() output.
+
+Each record is hashed from its canonical (key sorted) JSON and stored once,
+in its original key order, in a zlib compressed pack. A snapshot is a
+manifest of record hashes, stored as a delta from the previous snapshot's
+manifest, so a daily snapshot only adds the records and hashes that changed
+since the last one. Every MANIFEST_KEYFRAME_INTERVAL snapshots the manifest is
+stored in full, which bounds the chain read to reconstruct one.
+
+Layout of an archive directory:
+    packs/<date>.pack       concatenated zlib streams of the records new on <date>
+    manifests/<date>.json   {"base": date | null, "resources": {resource_key: [entry, ...] | hash}}
+                            entry: a hash, or [start, count] hashes copied from the base
+    index.json              {"objects": {hash: [pack, offset, size]},
+                             "history": {resource_key: {id: [[date, hash | null], ...]}}}
+
+Dates are YYYY-MM-DD. A snapshot exists once its manifest is written, which
+add() does last, after the pack and index.json.
+
+A null hash in the history marks the date a record was no longer in the
+snapshot; a later entry with a hash is its re-appearance.
+"""
+import argparse
+import bisect
+import datetime
+import hashlib
+import json
+import os
+import sys
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from compression import CompressedFileType
+
+ID_KEYS = ("id", "filament_id")
+MANIFEST_KEYFRAME_INTERVAL = 30
+
+
+def canonical_json(record: Any) -> bytes:
+    return json.dumps(
+        record, sort_keys=True, separators=(",", ":"), ensure_ascii=False
+    ).encode("utf-8")
+
+
+def record_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def record_id(record: Any) -> Optional[str]:
+    if isinstance(record, dict):
+        for key in ID_KEYS:
+            if record.get(key) is not None:
+                return str(record[key])
+    return None
+
+
+def snapshot_date(date: str) -> str:
+    """Validate a YYYY-MM-DD date, which orders and names the archive files."""
+    try:
+        valid = datetime.date.fromisoformat(date).isoformat() == date
+    except ValueError:
+        valid = False
+    if not valid:
+        raise ValueError(f"Invalid date {date!r}, expected YYYY-MM-DD")
+    return date
+
+
+def delta_encode(base: List[str], hashes: List[str]) -> List[Union[str, List[int]]]:
+    """hashes as literal hashes and [start, count] runs copied from base."""
+    positions: Dict[str, int] = {}
+    for i, digest in enumerate(base):
+        positions.setdefault(digest, i)
+    encoded: List[Union[str, List[int]]] = []
+    i = 0
+    while i < len(hashes):
+        start = positions.get(hashes[i])
+        if start is None:
+            encoded.append(hashes[i])
+            i += 1
+            continue
+        count = 1
+        while (
+            i + count < len(hashes)
+            and start + count < len(base)
+            and base[start + count] == hashes[i + count]
+        ):
+            count += 1
+        encoded.append([start, count])
+        i += count
+    return encoded
+
+
+def delta_decode(base: List[str], encoded: List[Union[str, List[int]]]) -> List[str]:
+    hashes: List[str] = []
+    for entry in encoded:
+        if isinstance(entry, str):
+            hashes.append(entry)
+        else:
+            start, count = entry
+            hashes.extend(base[start : start + count])
+    return hashes
+
+
+class SnapshotArchive:
+    def __init__(self, path: str):
+        self.path = path
+        self.index_path = os.path.join(path, "index.json")
+        self.packs_dir = os.path.join(path, "packs")
+        self.manifests_dir = os.path.join(path, "manifests")
+        if os.path.exists(self.index_path):
+            with open(self.index_path, "r") as f:
+                self.index = json.load(f)
+        else:
+            self.index = {"objects": {}, "history": {}}
+        self._dates = sorted(
+            name[: -len(".json")]
+            for name in (
+                os.listdir(self.manifests_dir)
+                if os.path.isdir(self.manifests_dir)
+                else []
+            )
+            if name.endswith(".json")
+        )
+        # Last reconstructed manifest: (date, manifest, delta chain length)
+        self._manifest_cache: Optional[Tuple[str, Dict[str, Any], int]] = None
+
+    @property
+    def dates(self) -> List[str]:
+        return list(self._dates)
+
+    def add(self, date: str, data: Dict[str, Any]) -> Tuple[int, int]:
+        """Store a parse() result as the snapshot for date; returns (new, total) records."""
+        snapshot_date(date)
+        if date in self._dates:
+            raise ValueError(f"Snapshot {date} already exists")
+        if self._dates and date < self._dates[-1]:
+            raise ValueError(f"Snapshot {date} is older than {self._dates[-1]}")
+        objects = self.index["objects"]
+        os.makedirs(self.packs_dir, exist_ok=True)
+        os.makedirs(self.manifests_dir, exist_ok=True)
+
+        # History of an add() that crashed before writing its manifest
+        last_date = self._dates[-1] if self._dates else ""
+        for history in self.index["history"].values():
+            for versions in history.values():
+                while versions and versions[-1][0] > last_date:
+                    versions.pop()
+
+        pack_name = f"{date}.pack"
+        pack_path = os.path.join(self.packs_dir, pack_name)
+        manifest = {}
+        seen: Dict[str, set] = {}
+        new_count = total_count = 0
+        # Appended: objects of a crashed add() may already point into this pack
+        with open(pack_path, "ab") as pack:
+
+            def store(record: Any) -> str:
+                nonlocal new_count, total_count
+                digest = record_hash(canonical_json(record))
+                total_count += 1
+                if digest not in objects:
+                    raw = json.dumps(
+                        record, separators=(",", ":"), ensure_ascii=False
+                    ).encode("utf-8")
+                    blob = zlib.compress(raw, 9)
+                    objects[digest] = [pack_name, pack.tell(), len(blob)]
+                    pack.write(blob)
+                    new_count += 1
+                return digest
+
+            for key, value in data.items():
+                if isinstance(value, list):
+                    hashes = manifest[key] = []
+                    history = self.index["history"].setdefault(key, {})
+                    ids = seen[key] = set()
+                    for record in value:
+                        digest = store(record)
+                        hashes.append(digest)
+                        rid = record_id(record)
+                        if rid is None:
+                            continue
+                        ids.add(rid)
+                        versions = history.setdefault(rid, [])
+                        if not versions or versions[-1][1] != digest:
+                            versions.append([date, digest])
+                else:
+                    manifest[key] = store(value)
+
+        for key, history in self.index["history"].items():
+            ids = seen.get(key, set())
+            for rid, versions in history.items():
+                if versions and versions[-1][1] is not None and rid not in ids:
+                    versions.append([date, None])
+
+        if os.path.getsize(pack_path) == 0:
+            os.remove(pack_path)
+        self._write_index()
+        self._write_manifest(date, manifest)
+        self._dates.append(date)
+        return new_count, total_count
+
+    def _write_index(self):
+        self._write_json(self.index_path, self.index)
+
+    def _write_manifest(self, date: str, manifest: Dict[str, Any]):
+        base_date, base, depth = None, {}, 0
+        if self._dates:
+            base_date = self._dates[-1]
+            base, depth = self._resolve_manifest(base_date)
+        if base_date is None or depth + 1 >= MANIFEST_KEYFRAME_INTERVAL:
+            base_date, base, depth = None, {}, -1
+        resources = {}
+        for key, value in manifest.items():
+            if isinstance(value, list):
+                base_value = base.get(key)
+                resources[key] = delta_encode(
+                    base_value if isinstance(base_value, list) else [], value
+                )
+            else:
+                resources[key] = value
+        self._write_json(
+            os.path.join(self.manifests_dir, f"{date}.json"),
+            {"base": base_date, "resources": resources},
+        )
+        self._manifest_cache = date, manifest, depth + 1
+
+    @staticmethod
+    def _write_json(path: str, data: Any):
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+        os.replace(tmp_path, path)
+
+    def resolve_date(self, date: str) -> Optional[str]:
+        """Latest snapshot date on or before date."""
+        i = bisect.bisect_right(self._dates, date)
+        return self._dates[i - 1] if i else None
+
+    def manifest(self, date: str) -> Dict[str, Any]:
+        """Reconstructed manifest of a snapshot date: {resource_key: [hash, ...] | hash}."""
+        return self._resolve_manifest(date)[0]
+
+    def _resolve_manifest(self, date: str) -> Tuple[Dict[str, Any], int]:
+        # Follow the base dates back to a full manifest or the cached one
+        chain = []
+        base_date: Optional[str] = date
+        while base_date is not None:
+            if self._manifest_cache is not None and self._manifest_cache[0] == base_date:
+                break
+            with open(os.path.join(self.manifests_dir, f"{base_date}.json"), "r") as f:
+                stored = json.load(f)
+            chain.append(stored["resources"])
+            base_date = stored["base"]
+        if base_date is None:
+            manifest, depth = {}, -1
+        else:
+            _, manifest, depth = self._manifest_cache
+        for resources in reversed(chain):
+            manifest = {
+                key: delta_decode(
+                    manifest[key] if isinstance(manifest.get(key), list) else [], value
+                )
+                if isinstance(value, list)
+                else value
+                for key, value in resources.items()
+            }
+            depth += 1
+        self._manifest_cache = date, manifest, depth
+        return manifest, depth
+
+    def records(self, hashes: List[str]) -> Iterator[Any]:
+        """Load records by hash, reading each pack once in offset order."""
+        objects = self.index["objects"]
+        order = sorted(range(len(hashes)), key=lambda i: objects[hashes[i]][:2])
+        loaded: List[Any] = [None] * len(hashes)
+        pack, pack_name = None, None
+        try:
+            for i in order:
+                name, offset, size = objects[hashes[i]]
+                if name != pack_name:
+                    if pack is not None:
+                        pack.close()
+                    pack = open(os.path.join(self.packs_dir, name), "rb")
+                    pack_name = name
+                pack.seek(offset)
+                loaded[i] = json.loads(zlib.decompress(pack.read(size)))
+        finally:
+            if pack is not None:
+                pack.close()
+        return iter(loaded)
+
+    def snapshot(self, date: str) -> Optional[Dict[str, Any]]:
+        """Reconstruct the catalog as of date."""
+        snapshot_date = self.resolve_date(date)
+        if snapshot_date is None:
+            return None
+        manifest = self.manifest(snapshot_date)
+        keys = list(manifest.keys())
+        flat = []
+        for key in keys:
+            value = manifest[key]
+            flat.extend(value if isinstance(value, list) else [value])
+        loaded = self.records(flat)
+        result = {}
+        for key in keys:
+            value = manifest[key]
+            if isinstance(value, list):
+                result[key] = [next(loaded) for _ in value]
+            else:
+                result[key] = next(loaded)
+        return result
+
+    def history(self, resource_key: str, rid: str) -> List[Tuple[str, Any]]:
+        """All distinct versions of a record as [(first_seen_date, record), ...].
+
+        The record is None from a date it was missing from the snapshot.
+        """
+        versions = self.index["history"].get(resource_key, {}).get(str(rid), [])
+        loaded = self.records([h for _, h in versions if h is not None])
+        return [(date, None if h is None else next(loaded)) for date, h in versions]
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("archive", help="path to the archive directory")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    add_parser = subparsers.add_parser("add", help="Add a parsed snapshot")
+    add_parser.add_argument(
+        "file", type=CompressedFileType("r"), help="path to a parser.py output file"
+    )
+    add_parser.add_argument(
+        "--date", required=True, type=snapshot_date, help="snapshot date (YYYY-MM-DD)"
+    )
+
+    show_parser = subparsers.add_parser("show", help="Print the catalog as of a date")
+    show_parser.add_argument(
+        "--date", required=True, type=snapshot_date, help="date (YYYY-MM-DD)"
+    )
+
+    history_parser = subparsers.add_parser("history", help="Print versions of a record")
+    history_parser.add_argument("id", help="record id")
+    history_parser.add_argument(
+        "--resource", default="filaments", help="resource key; defaults to filaments"
+    )
+
+    subparsers.add_parser("list", help="List snapshot dates")
+    args = parser.parse_args()
+
+    archive = SnapshotArchive(args.archive)
+    if args.command == "add":
+        try:
+            new_count, total_count = archive.add(args.date, json.load(args.file))
+        except ValueError as e:
+            print(f"Error: {e}", file=sys.stderr)
+            exit(1)
+        print(
+            f"Added {args.date}: {new_count} new of {total_count} records",
+            file=sys.stderr,
+        )
+    elif args.command == "show":
+        data = archive.snapshot(args.date)
+        if data is None:
+            print(f"Error: no snapshot on or before {args.date}", file=sys.stderr)
+            exit(1)
+        print(json.dumps(data, indent=2))
+    elif args.command == "history":
+        versions = archive.history(args.resource, args.id)
+        if not versions:
+            print(f"Error: no history for {args.resource} {args.id}", file=sys.stderr)
+            exit(1)
+        print(
+            json.dumps(
+                [{"date": date, "record": record} for date, record in versions],
+                indent=2,
+            )
+        )
+    elif args.command == "list":
+        print("\n".join(archive.dates))